@@ -23,7 +23,13 @@
 # Cut down by Ysobel Sims, University of Newcastle 2024
 
 import json, shutil, os, sys, argparse
-from jsonschema import validate
+from jsonschema.validators import validator_for
+
+# compiled validators are much faster, but fall back to jsonschema if unavailable
+try:
+    import fastjsonschema
+except ImportError:
+    fastjsonschema = None
 import util.SupportClasses as SupportClasses
 import AviaNZ_batch
 
@@ -65,26 +71,74 @@ if not os.path.isdir(configdir):
         # print(e)
         raise
 
+
+def fileStamp(path):
+    """Returns the [mtime, size] stamp used to tell if a file changed since last run."""
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def listFiles(dir):
+    """Returns the set of file names in dir, from a single directory listing."""
+    with os.scandir(dir) as it:
+        return {entry.name for entry in it if entry.is_file()}
+
+
+def getValidator(schemafile):
+    """Returns a validation function for a schema, which raises on invalid input.
+    Uses fastjsonschema to compile the schema into Python code when available.
+    """
+    schema = SupportClasses.loadJSON(schemafile)
+    if fastjsonschema is not None:
+        return fastjsonschema.compile(schema)
+    return validator_for(schema)(schema).validate
+
+
 # pre-run check of config file validity
+# (skipped if neither the schemas nor the config files changed since
+# the last successful validation, as recorded in the schema cache)
 confloader = SupportClasses.ConfigLoader()
-configschema = json.load(open("Config/config.schema"))
-learnparschema = json.load(open("Config/learnpar.schema"))
+configfile = os.path.join(configdir, "AviaNZconfig.txt")
+learnparfile = os.path.join(configdir, "LearningParams.txt")
+schemacache = os.path.join(configdir, ".schema.cache")
 try:
-    config = confloader.config(os.path.join(configdir, "AviaNZconfig.txt"))
-    validate(instance=config, schema=configschema)
-    learnpar = confloader.learningParams(os.path.join(configdir, "LearningParams.txt"))
-    validate(instance=learnpar, schema=learnparschema)
-    # print("successfully validated config file")
-except Exception as e:
-    # print("Warning: config file failed validation with:")
-    # print(e)
+    stamps = {
+        f: fileStamp(f)
+        for f in [
+            "Config/config.schema",
+            "Config/learnpar.schema",
+            configfile,
+            learnparfile,
+        ]
+    }
+    with open(schemacache) as f:
+        validated = json.load(f) == stamps
+except Exception:
+    validated = False
+
+if not validated:
     try:
-        shutil.copy2("Config/AviaNZconfig.txt", configdir)
-        shutil.copy2("Config/LearningParams.txt", configdir)
+        config = confloader.config(configfile)
+        getValidator("Config/config.schema")(config)
+        learnpar = confloader.learningParams(learnparfile)
+        getValidator("Config/learnpar.schema")(learnpar)
+        # print("successfully validated config file")
+        try:
+            with open(schemacache, "w") as f:
+                json.dump(stamps, f)
+        except Exception as e:
+            print("Warning: failed to store schema cache %s" % schemacache)
+            print(e)
     except Exception as e:
-        # print("ERROR: failed to copy essential config files")
+        # print("Warning: config file failed validation with:")
         # print(e)
-        raise
+        try:
+            shutil.copy2("Config/AviaNZconfig.txt", configdir)
+            shutil.copy2("Config/LearningParams.txt", configdir)
+        except Exception as e:
+            # print("ERROR: failed to copy essential config files")
+            # print(e)
+            raise
 
 # check and if needed copy any other necessary files
 necessaryFiles = [
@@ -93,8 +147,9 @@ necessaryFiles = [
     "ListBats.txt",
     "LearningParams.txt",
 ]
+existingFiles = listFiles(configdir)
 for f in necessaryFiles:
-    if not os.path.isfile(os.path.join(configdir, f)):
+    if f not in existingFiles:
         # print("File %s not found in config dir, providing default" % f)
         try:
             shutil.copy2(os.path.join("Config", f), configdir)
@@ -104,13 +159,23 @@ for f in necessaryFiles:
             raise
 
 # copy over filters to ~/.avianz/Filters/:
+# (skipped if neither filter folder changed since the last copy)
 filterdir = os.path.join(configdir, "Filters/")
 if not os.path.isdir(filterdir):
     # print("Creating filter dir %s" % filterdir)
     os.makedirs(filterdir)
-for f in os.listdir("Filters"):
-    ff = os.path.join("Filters", f)  # Kiwi.txt
-    if not os.path.isfile(os.path.join(filterdir, f)):  # ~/.avianz/Filters/Kiwi.txt
+filtermanifest = os.path.join(configdir, ".filters.manifest")
+try:
+    with open(filtermanifest) as f:
+        filterscopied = json.load(f) == [fileStamp("Filters"), fileStamp(filterdir)]
+except Exception:
+    filterscopied = False
+
+if not filterscopied:
+    existingFilters = listFiles(filterdir)  # ~/.avianz/Filters/*
+    # regular files only, and only those missing from the user's folder
+    for f in listFiles("Filters") - existingFilters:
+        ff = os.path.join("Filters", f)  # Kiwi.txt
         # print("Recogniser %s not found, providing default" % f)
         try:
             shutil.copy2(ff, filterdir)  # cp Filters/Kiwi.txt ~/.avianz/Filters/
@@ -120,6 +185,15 @@ for f in os.listdir("Filters"):
 
 avianzbatch = AviaNZ_batch.AviaNZ_batchProcess(configdir, args.recogniser)
 
+# (stored after loading the filters, as creating their cache changes filterdir)
+if not filterscopied:
+    try:
+        with open(filtermanifest, "w") as f:
+            json.dump([fileStamp("Filters"), fileStamp(filterdir)], f)
+    except Exception as e:
+        print("Warning: failed to store filter manifest %s" % filtermanifest)
+        print(e)
+
 ### THE DETECTION ###
 detection = avianzbatch.detect(args.filename)
 if len(detection) > 0:
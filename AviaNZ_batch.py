@@ -18,7 +18,7 @@
 
 #    You should have received a copy of the GNU General Public License
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import gc, os, re
+import os, re
 import time
 import numpy as np
 
@@ -28,6 +28,9 @@ import util.WaveletSegment as WaveletSegment
 import util.SupportClasses as SupportClasses
 import util.wavio as wavio
 
+# DOC recordings are named *YYMMDD_HHMMSS*
+DOC_RE = re.compile(r"(\d{6})_(\d{6})")
+
 
 class AviaNZ_batchProcess:
     # Main class for batch processing
@@ -57,6 +60,12 @@ class AviaNZ_batchProcess:
 
         self.species = [recogniser]
 
+        # one post-processor, reset for every page and subfilter
+        self.post = Segment.PostProcess(configdir=self.configdir)
+
+        # CNN models, loaded on the first detect call
+        self.CNNDicts = None
+
     def detect(self, filename):
         # This is the function that does the work.
         # Chooses the filters and sampling regime to use.
@@ -86,9 +95,11 @@ class AviaNZ_batchProcess:
 
         # load target CNN models (currently stored in the same dir as filters)
         # format: {filtername: [model, win, inputdim, output]}
-        self.CNNDicts = self.ConfigLoader.CNNmodels(
-            self.FilterDicts, self.filtersDir, self.species
-        )
+        # (species are fixed for this instance, so this is only done once)
+        if self.CNNDicts is None:
+            self.CNNDicts = self.ConfigLoader.CNNmodels(
+                self.FilterDicts, self.filtersDir, self.species
+            )
 
         allwavs = [filename]
 
@@ -122,6 +133,9 @@ class AviaNZ_batchProcess:
 
         timeWindow_s = settings[1]
         timeWindow_e = settings[2]
+        # with no time window set, all files are processed,
+        # so there is no need to parse the filenames at all
+        useTimeWindow = timeWindow_s != timeWindow_e
 
         for filename in allwavs:
             # get remaining run time in min
@@ -130,29 +144,18 @@ class AviaNZ_batchProcess:
             cnt = cnt + 1
 
             # test the selected time window if it is a doc recording
-            DOCRecording = re.search(r"(\d{6})_(\d{6})", os.path.basename(filename))
-            if DOCRecording:
-                startTime = DOCRecording.group(2)
-                sTime = (
-                    int(startTime[:2]) * 3600
-                    + int(startTime[2:4]) * 60
-                    + int(startTime[4:6])
-                )
-                if timeWindow_s == timeWindow_e:
-                    # (no time window set)
-                    inWindow = True
-                elif timeWindow_s < timeWindow_e:
-                    # for day times ("8 to 17")
-                    inWindow = sTime >= timeWindow_s and sTime <= timeWindow_e
-                else:
-                    # for times that include midnight ("17 to 8")
-                    inWindow = sTime >= timeWindow_s or sTime <= timeWindow_e
-            else:
-                inWindow = True
-
-            if DOCRecording and not inWindow:
-                self.log.appendFile(filename)
-                continue
+            if useTimeWindow:
+                sTime = self.getDOCStartTime(filename)
+                if sTime is not None:
+                    if timeWindow_s < timeWindow_e:
+                        # for day times ("8 to 17")
+                        inWindow = sTime >= timeWindow_s and sTime <= timeWindow_e
+                    else:
+                        # for times that include midnight ("17 to 8")
+                        inWindow = sTime >= timeWindow_s or sTime <= timeWindow_e
+                    if not inWindow:
+                        self.log.appendFile(filename)
+                        continue
 
             # ALL SYSTEMS GO: process this file
             self.filename = filename
@@ -175,15 +178,40 @@ class AviaNZ_batchProcess:
                     impMask=impMask,
                 )
 
-                # initialize empty segmenter
-                if self.method == "Wavelets":
+                # initialize empty segmenter (reused over files,
+                # as readBatch replaces all of its per-page state)
+                if self.method == "Wavelets" and not hasattr(self, "ws"):
                     self.ws = WaveletSegment.WaveletSegment(wavelet="dmey2")
-                    del self.sp
-                    gc.collect()
 
                 # Main work is done here:
                 self.detectFile(speciesStr, filters)
 
+    def getDOCStartTime(self, filename):
+        """Returns the start time of a DOC recording in s since midnight,
+        or None if the filename does not follow the DOC format.
+        """
+        basename = os.path.basename(filename)
+        # Fast path for the usual *YYMMDD_HHMMSS* names: the first "_"
+        # splits the date and time, so the regex is only needed otherwise.
+        # (isdecimal matches exactly what \d does)
+        parts = basename.split("_", 2)
+        if (
+            len(parts) > 1
+            and parts[0][-6:].isdecimal()
+            and len(parts[0]) >= 6
+            and parts[1][:6].isdecimal()
+            and len(parts[1]) >= 6
+        ):
+            startTime = parts[1][:6]
+        else:
+            DOCRecording = DOC_RE.search(basename)
+            if not DOCRecording:
+                return None
+            startTime = DOCRecording.group(2)
+        return (
+            int(startTime[:2]) * 3600 + int(startTime[2:4]) * 60 + int(startTime[4:6])
+        )
+
     def addRegularSegments(self):
         """Perform the Hartley bodge: add 10s segments every minute."""
         # if wav.data exists get the duration
@@ -192,14 +220,12 @@ class AviaNZ_batchProcess:
         self.segments.metadata["Operator"] = "Auto"
         self.segments.metadata["Reviewer"] = ""
         self.segments.metadata["Duration"] = nseconds
-        i = 0
-        segments = []
-
-        while i < nseconds:
-            segments.append([i, i + self.config["protocolSize"]])
-            i += self.config["protocolInterval"]
-        post = Segment.PostProcess(
-            configdir=self.configdir,
+        # (nseconds is a float, so keep the type of the interval for the starts)
+        interval = self.config["protocolInterval"]
+        starts = np.arange(0, nseconds, interval, dtype=type(interval)).tolist()
+        segments = [[i, i + self.config["protocolSize"]] for i in starts]
+        post = self.post
+        post.reset(
             audioData=None,
             sampleRate=0,
             segments=segments,
@@ -236,18 +262,21 @@ class AviaNZ_batchProcess:
             # A sensible default
             samplesInPage = 900 * 16000
 
-        # (ceil division for large integers)
-        numPages = (self.datalength - 1) // samplesInPage + 1
+        # Split into pages of samplesInPage (the last one may be shorter).
+        # These are views, shared by everything below that needs the page.
+        pageStarts = np.arange(0, self.datalength, samplesInPage)
+        pages = np.split(self.audiodata, pageStarts[1:])
 
         # Actual segmentation happens here:
-        for page in range(numPages):
-            start = page * samplesInPage
-            end = min(start + samplesInPage, self.datalength)
-            thisPageLen = (end - start) / self.sampleRate
+        for start, pageData in zip(pageStarts.tolist(), pages):
+            thisPageLen = len(pageData) / self.sampleRate
 
             if thisPageLen < 2 and (self.method != "Click" and self.method != "Bats"):
                 continue
 
+            # page start in s, to adjust segment times for 15min "pages"
+            pageOffset = start / self.sampleRate
+
             # Process
             if speciesStr == "Any sound":
                 # Create spectrogram for median clipping etc
@@ -255,7 +284,7 @@ class AviaNZ_batchProcess:
                     self.sp = SignalProc.SignalProc(
                         self.config["window_width"], self.config["incr"]
                     )
-                self.sp.data = self.audiodata[start:end]
+                self.sp.data = pageData
                 self.sp.sampleRate = self.sampleRate
                 _ = self.sp.spectrogram(
                     window="Hann", sgType="Standard", mean_normalise=True, onesided=True
@@ -264,9 +293,9 @@ class AviaNZ_batchProcess:
                 # thisPageSegs = self.seg.bestSegments()
                 thisPageSegs = self.seg.medianClip(thr=3.5)
                 # Post-process
-                post = Segment.PostProcess(
-                    configdir=self.configdir,
-                    audioData=self.audiodata[start:end],
+                post = self.post
+                post.reset(
+                    audioData=pageData,
                     sampleRate=self.sampleRate,
                     segments=thisPageSegs,
                     subfilter={},
@@ -278,19 +307,16 @@ class AviaNZ_batchProcess:
                 post.splitLong(self.maxlen)
 
                 # adjust segment starts for 15min "pages"
-                if start != 0:
-                    for seg in post.segments:
-                        seg[0][0] += start / self.sampleRate
-                        seg[0][1] += start / self.sampleRate
+                if pageOffset != 0:
+                    post.addOffset(pageOffset)
                 # attach mandatory "Don't Know"s etc and put on self.segments
                 self.makeSegments(self.segments, post.segments)
                 del self.seg
-                gc.collect()
             else:
                 if self.method != "Click" and self.method != "Bats":
                     # read in the page and resample as needed
                     self.ws.readBatch(
-                        self.audiodata[start:end],
+                        pageData,
                         self.sampleRate,
                         d=False,
                         spInfo=filters,
@@ -299,41 +325,30 @@ class AviaNZ_batchProcess:
                     )
 
                 for speciesix in range(len(filters)):
-                    # Bird detection by wavelets. Choose the right wavelet method:
-                    if (
-                        "method" not in filters[speciesix]
-                        or filters[speciesix]["method"] == "wv"
-                    ):
-                        # note: using 'recaa' mode = partial antialias
-                        thisPageSegs = self.ws.waveletSegment(speciesix, wpmode="new")
-                    elif filters[speciesix]["method"] == "chp":
-                        # note that only allowing alg2 = nuisance-robust chp detection
-                        thisPageSegs = self.ws.waveletSegmentChp(
-                            speciesix, alg=2, wind=False
-                        )
-                    else:
-                        print(
-                            "ERROR: unrecognized method", filters[speciesix]["method"]
-                        )
-                        raise Exception
+                    # Bird detection by wavelets:
+                    thisPageSegs = self.segmentSpecies(filters[speciesix], speciesix)
 
                     # Post-process:
                     # CNN-classify, delete windy, rainy segments, check for FundFreq, merge gaps etc.
                     # postProcess currently operates on single-level list of segments,
                     # so we run it over subfilters for wavelets:
                     spInfo = filters[speciesix]
+                    # the CNN is per species, so look it up once for all subfilters
+                    CNNmodel = None
+                    if "CNN" in spInfo:
+                        # This list contains the model itself, plus parameters for running it
+                        CNNmodel = self.CNNDicts.get(spInfo["CNN"]["CNN_name"])
                     for filtix in range(len(spInfo["Filters"])):
-                        CNNmodel = None
-                        if "CNN" in spInfo:
-                            if spInfo["CNN"]["CNN_name"] in self.CNNDicts.keys():
-                                # This list contains the model itself, plus parameters for running it
-                                CNNmodel = self.CNNDicts[spInfo["CNN"]["CNN_name"]]
-
                         # TODO THIS IS FULL POST-PROC PIPELINE FOR BIRDS AND BATS
                         # -- Need to check how this should interact with the testmode
                         # bird-style CNN and other processing:
                         postsegs = self.postProcFull(
-                            thisPageSegs, spInfo, filtix, start, end, CNNmodel
+                            thisPageSegs,
+                            spInfo,
+                            filtix,
+                            pageData,
+                            pageOffset,
+                            CNNmodel,
                         )
                         # attach filter info and put on self.segments:
                         self.makeSegments(
@@ -345,16 +360,31 @@ class AviaNZ_batchProcess:
                         )
         return len(postsegs)
 
-    def postProcFull(self, segments, spInfo, filtix, start, end, CNNmodel):
+    def segmentSpecies(self, spInfo, speciesix):
+        """Wavelet segmentation of the current page for one species,
+        using the wavelet method set in its filter spInfo.
+        """
+        if "method" not in spInfo or spInfo["method"] == "wv":
+            # note: using 'recaa' mode = partial antialias
+            return self.ws.waveletSegment(speciesix, wpmode="new")
+        elif spInfo["method"] == "chp":
+            # note that only allowing alg2 = nuisance-robust chp detection
+            return self.ws.waveletSegmentChp(speciesix, alg=2, wind=False)
+        else:
+            print("ERROR: unrecognized method", spInfo["method"])
+            raise Exception
+
+    def postProcFull(self, segments, spInfo, filtix, pageData, pageOffset, CNNmodel):
         """Full bird-style postprocessing (CNN, joinGaps...)
         segments: list of segments over calltypes
-        start, end: start and end of this page, in samples
+        pageData: audiodata of this page
+        pageOffset: start of this page, in s
         CNNmodel: None or a CNN
         """
         subfilter = spInfo["Filters"][filtix]
-        post = Segment.PostProcess(
-            configdir=self.configdir,
-            audioData=self.audiodata[start:end],
+        post = self.post
+        post.reset(
+            audioData=pageData,
             sampleRate=self.sampleRate,
             tgtsampleRate=spInfo["SampleRate"],
             segments=segments[filtix],
@@ -379,16 +409,18 @@ class AviaNZ_batchProcess:
             post.deleteShort(minlength=subfilter["TimeRange"][0])
 
         # adjust segment starts for 15min "pages"
-        if start != 0:
-            for seg in post.segments:
-                seg[0][0] += start / self.sampleRate
-                seg[0][1] += start / self.sampleRate
+        if pageOffset != 0:
+            post.addOffset(pageOffset)
         return post.segments
 
     def makeSegments(
         self, segmentsList, segmentsNew, filtName=None, species=None, subfilter=None
     ):
         """Adds segmentsNew to segmentsList"""
+        # (most pages of a quiet recording produce no segments)
+        if len(segmentsNew) == 0:
+            return
+
         if subfilter is not None:
             y1 = subfilter["FreqRange"][0]
             y2 = min(subfilter["FreqRange"][1], self.sampleRate // 2)
@@ -479,11 +511,14 @@ class AviaNZ_batchProcess:
                 # shorthand for double-checking that it's not "Any Sound" etc
                 if sp in self.FilterDicts:
                     spname = self.FilterDicts[sp]["species"]
-                    oldsegs = self.segments.getSpecies(spname)
-                    for i in reversed(oldsegs):
-                        wipeAll = self.segments[i].wipeSpecies(spname)
-                        if wipeAll:
-                            del self.segments[i]
+                    oldsegs = set(self.segments.getSpecies(spname))
+                    # rebuild once instead of deleting fully wiped segments
+                    # one by one, which shifts the list each time
+                    self.segments[:] = [
+                        seg
+                        for i, seg in enumerate(self.segments)
+                        if i not in oldsegs or not seg.wipeSpecies(spname)
+                    ]
 
         # impulse masking (on by default)
         if impMask:
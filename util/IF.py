@@ -820,7 +820,7 @@ class IF:
         idid=np.zeros((1,L))*(math.nan)
         idid[0,tn2]=np.nanargmax(U[:,tn2]).astype('int')
         idid = idid.astype('int')
-        for tn in np.arange(tn2-1,tn1-1,-1):
+        for tn in range(tn2-1,tn1-1,-1):
             idid[0,tn]=q[idid[0,tn+1],tn+1]
 
         return idid
@@ -28,7 +28,6 @@ import scipy.ndimage as spi
 from scipy import signal
 import librosa
 import time
-import json
 import os
 import math
 import copy
@@ -36,13 +35,6 @@ import util.wavio as wavio
 from scipy.interpolate import interp1d
 from scipy.signal import medfilt
 import skimage.measure as skm
-import tensorflow as tf
-
-try:
-    physical_devices = tf.config.list_physical_devices("GPU")
-    tf.config.experimental.set_memory_growth(physical_devices[0], True)
-except:
-    pass
 
 
 class Segment(list):
@@ -133,7 +125,7 @@ class Segment(list):
         """Remove all labels for species, return True if all labels were wiped
         (and the interface should delete the segment).
         """
-        deletedAll = list(set([lab["species"] for lab in self[4]])) == [species]
+        deletedAll = {lab["species"] for lab in self[4]} == {species}
         # note that removeLabel will re-add a Don't Know in the end, so can't just check the final label.
         for lab in reversed(self[4]):
             if lab["species"] == species:
@@ -182,8 +174,8 @@ class Segment(list):
                 and lab["species"] != "Don't Know"
             ):
                 # check if this segment has a yellow label for this species already
-                otherLabels = [k[0] == lab["species"] and k[1] < 100 for k in self.keys]
-                if any(otherLabels):
+                # (stops at the first match)
+                if any(k[0] == lab["species"] and k[1] < 100 for k in self.keys):
                     # then just delete this label
                     toremove.append(lab)
                 else:
@@ -262,9 +254,7 @@ class SegmentList(list):
         (it will override any duration read from the JSON).
         """
         try:
-            f = open(file, "r")
-            annots = json.load(f)
-            f.close()
+            annots = SupportClasses.loadJSON(file)
         except Exception as e:
             print("ERROR: file %s failed to load with error:" % file)
             print(e)
@@ -411,18 +401,18 @@ class SegmentList(list):
                     pass
         return out
 
-    def saveJSON(self, file, reviewer=""):
-        """Returns 1 on succesful save."""
+    def toJSON(self, reviewer=""):
+        """Returns the contents of the .data file for this list, as bytes."""
         if reviewer != "":
             self.metadata["Reviewer"] = reviewer
         annots = [self.metadata]
         for seg in self:
             annots.append(seg)
+        return SupportClasses.dumpJSON(annots)
 
-        file = open(file, "w")
-        json.dump(annots, file)
-        file.write("\n")
-        file.close()
+    def saveJSON(self, file, reviewer=""):
+        """Returns 1 on succesful save."""
+        SupportClasses.writeAtomic(str(file), self.toJSON(reviewer))
         return 1
 
     def orderTime(self):
@@ -444,9 +434,9 @@ class SegmentList(list):
         toadd = []
         for seg in self:
             # if species is given, only split segments where it is present:
-            if species is not None and species not in [
-                lab["species"] for lab in seg[4]
-            ]:
+            if species is not None and all(
+                lab["species"] != species for lab in seg[4]
+            ):
                 continue
             l = seg[1] - seg[0]
             if l > maxlen:
@@ -523,12 +513,15 @@ class SegmentList(list):
             return
 
         # get parameter limits for populating training dialogs:
+        # one array of [start, end, fLow, fHigh] rows instead of a list per stat
+        bounds = np.array([seg[:4] for seg in self])
         # FreqRange, in Hz
-        fLow = np.min([seg[2] for seg in self])
-        fHigh = np.max([seg[3] for seg in self])
+        fLow = bounds[:, 2].min()
+        fHigh = bounds[:, 3].max()
         # TimeRange, in s
-        lenMin = np.min([seg[1] - seg[0] for seg in self])
-        lenMax = np.max([seg[1] - seg[0] for seg in self])
+        lengths = bounds[:, 1] - bounds[:, 0]
+        lenMin = lengths.min()
+        lenMax = lengths.max()
 
         return (lenMin, lenMax, fLow, fHigh)
 
@@ -1067,7 +1060,9 @@ class Segmenter:
 
         """
         tt = time.time()
-        sg = self.sg / np.max(self.sg)
+        # Both thresholds scale with the spectrogram, so the clipping is
+        # done on self.sg directly rather than on a normalised copy.
+        sg = self.sg
 
         # This next line gives an exact match to Lasseck, but screws up bitterns!
         # sg = sg[4:232, :]
@@ -1075,13 +1070,10 @@ class Segmenter:
         rowmedians = np.median(sg, axis=1)
         colmedians = np.median(sg, axis=0)
 
-        clipped = np.zeros(np.shape(sg), dtype=int)
-        for i in range(np.shape(sg)[0]):
-            for j in range(np.shape(sg)[1]):
-                if (sg[i, j] > thr * rowmedians[i]) and (
-                    sg[i, j] > thr * colmedians[j]
-                ):
-                    clipped[i, j] = 1
+        # single pass over the spectrogram for both row and column tests
+        clipped = (
+            (sg > thr * rowmedians[:, np.newaxis]) & (sg > thr * colmedians)
+        ).astype(int)
 
         # This is the stencil for the closing and dilation. It's a 5x5 diamond. Can also use a 3x3 diamond
         diamond = np.zeros((5, 5), dtype=int)
@@ -1276,6 +1268,8 @@ class PostProcess:
         and subsequent functions deal with certainty values.
     subfilter:  AviaNZ format subfilter
     cert:       Default certainty to attach to the segments
+
+    One instance can be reused over pages and subfilters by calling reset.
     """
 
     def __init__(
@@ -1290,6 +1284,25 @@ class PostProcess:
         cert=0,
     ):
         self.configdir = configdir
+        self.LearningDict = None
+        self.CNNoutputs = None
+        self.reset(
+            audioData, sampleRate, tgtsampleRate, segments, subfilter, CNNmodel, cert
+        )
+
+    def reset(
+        self,
+        audioData=None,
+        sampleRate=0,
+        tgtsampleRate=0,
+        segments=[],
+        subfilter={},
+        CNNmodel=None,
+        cert=0,
+    ):
+        """Sets up this instance for new data, segments and subfilter.
+        Learning parameters are only read from configdir the first time a CNN is used.
+        """
         self.audioData = audioData
         self.sampleRate = sampleRate
         self.subfilter = subfilter
@@ -1304,10 +1317,11 @@ class PostProcess:
             self.segments.append([seg, cert])
 
         if CNNmodel:
-            cl = SupportClasses.ConfigLoader()
-            self.LearningDict = cl.learningParams(
-                os.path.join(configdir, "LearningParams.txt")
-            )
+            if self.LearningDict is None:
+                cl = SupportClasses.ConfigLoader()
+                self.LearningDict = cl.learningParams(
+                    os.path.join(self.configdir, "LearningParams.txt")
+                )
 
             self.CNNmodel = CNNmodel[
                 0
@@ -1316,6 +1330,9 @@ class PostProcess:
             # self.CNNhop = CNNmodel[1][1]
             self.CNNhop = self.LearningDict["hopScaling"] * self.CNNwindow
             self.CNNinputdim = CNNmodel[2]
+            if CNNmodel[3] is not self.CNNoutputs:
+                # reverse calltype -> output index lookup, reused with the model
+                self.CNNctkeys = {ct: int(key) for key, ct in CNNmodel[3].items()}
             self.CNNoutputs = CNNmodel[3]
             self.CNNwindowInc = CNNmodel[4]  # [window,incr] for making the spec
             self.CNNthrs = CNNmodel[5]
@@ -1328,15 +1345,12 @@ class PostProcess:
             self.CNNmodel = None
 
         if subfilter != {}:
-            self.minLen = subfilter["TimeRange"][0]
-            self.maxLen = subfilter["TimeRange"][1]
+            # reset runs for every subfilter and page, so read each field once
+            self.minLen, self.maxLen, self.syllen = subfilter["TimeRange"][:3]
             if "F0Range" in subfilter:
                 self.F0 = subfilter["F0Range"]
-            self.fLow = subfilter["FreqRange"][0]
-            self.fHigh = subfilter["FreqRange"][1]
-            self.minLen = subfilter["TimeRange"][0]
+            self.fLow, self.fHigh = subfilter["FreqRange"][:2]
             self.calltype = subfilter["calltype"]
-            self.syllen = subfilter["TimeRange"][2]
         else:
             self.minLen = 0.25
             self.fLow = 0
@@ -1366,11 +1380,8 @@ class PostProcess:
             return
         if len(self.segments) == 0:
             return
-        ctkey = int(
-            list(self.CNNoutputs.keys())[
-                list(self.CNNoutputs.values()).index(self.calltype)
-            ]
-        )
+        tf = SupportClasses.loadTensorflow()
+        ctkey = self.CNNctkeys[self.calltype]
         batchsize = 5  # TODO: read from learning parameters file
 
         # spectrograms of pre-cut segs are tiny bit shorter than expected
@@ -1386,10 +1397,16 @@ class PostProcess:
             )
         )
 
+        # loop invariants: one SignalProc is reused for all segments
+        mincalllength = self.CNNwindow
+        audiolength = len(self.audioData) / self.sampleRate
+        sp = SignalProc.SignalProc(
+            window_width=self.CNNwindowInc[0], incr=self.CNNwindowInc[1]
+        )
+
         for ix in reversed(range(len(self.segments))):
             seg = self.segments[ix]
             # expand the segment if it's smaller than 1 frame
-            mincalllength = self.CNNwindow
             duration = seg[0][1] - seg[0][0]
             if mincalllength >= duration:
                 extend_by = (mincalllength - duration) / 2 + 0.005
@@ -1398,11 +1415,9 @@ class PostProcess:
                 if seg[0][0] < 0:
                     seg[0][0] = 0
                     seg[0][1] = mincalllength + 0.01
-                elif seg[0][1] * self.sampleRate > len(self.audioData):
-                    seg[0][0] = (
-                        len(self.audioData) / self.sampleRate - mincalllength - 0.01
-                    )
-                    seg[0][1] = len(self.audioData) / self.sampleRate
+                elif seg[0][1] > audiolength:
+                    seg[0][0] = audiolength - mincalllength - 0.01
+                    seg[0][1] = audiolength
                 duration = seg[0][1] - seg[0][0]
 
             # Extract the audiodata corresponding to the segment
@@ -1411,9 +1426,6 @@ class PostProcess:
             ]
 
             # Generate features for CNN, overlapped windows
-            sp = SignalProc.SignalProc(
-                window_width=self.CNNwindowInc[0], incr=self.CNNwindowInc[1]
-            )
             sp.data = data
             sp.sampleRate = self.sampleRate
             if self.sampleRate != self.tgtsampleRate:
@@ -1596,20 +1608,22 @@ class PostProcess:
             print("No segments to remove wind from")
             return
 
-        newSegments = copy.deepcopy(self.segments)
+        # segments are only dropped, never changed, so keep references
+        # instead of deep-copying them all and removing by value
+        newSegments = []
         for seg in self.segments:
             data = self.audioData[
                 int(seg[0][0] * self.sampleRate) : int(seg[0][1] * self.sampleRate)
             ]
-            ind = np.flatnonzero(data).tolist()  # eliminate impulse masked sections
-            data = np.asarray(data)[ind].tolist()
-            if len(data) == 0:
-                continue
-            m, _, fn = self.wind_cal(
-                data=data, sampleRate=self.sampleRate, fn_peak=fn_peak
-            )
-            if m > windT and not fn:
-                newSegments.remove(seg)
+            # eliminate impulse masked sections (kept as an array for welch)
+            data = data[np.flatnonzero(data)]
+            if len(data) > 0:
+                m, _, fn = self.wind_cal(
+                    data=data, sampleRate=self.sampleRate, fn_peak=fn_peak
+                )
+                if m > windT and not fn:
+                    continue
+            newSegments.append(seg)
         self.segments = newSegments
 
     def rainClick(self):
@@ -1692,6 +1706,16 @@ class PostProcess:
                 if (meanF0 < self.F0[0]) or (meanF0 > self.F0[1]):
                     del self.segments[segix]
 
+    def addOffset(self, offset):
+        """Shifts the times of all segments by offset (s),
+        e.g. to convert times within a page to times within the file.
+        """
+        if len(self.segments) == 0:
+            return
+        times = np.array([seg[0] for seg in self.segments], dtype=float) + offset
+        for seg, t in zip(self.segments, times.tolist()):
+            seg[0] = t
+
     # The following are just wrappers for easier parsing of 3-element segment lists:
     # Segmenter class still has its own joinGaps etc which operate on 2-element lists
     def joinGaps(self, maxgap):
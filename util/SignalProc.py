@@ -22,6 +22,7 @@
 import numpy as np
 import scipy.signal as signal
 import scipy.fftpack as fft
+import scipy.fft as sp_fft
 from scipy.stats import boxcox
 import util.wavio as wavio
 import librosa
@@ -43,6 +44,82 @@ from scipy.signal import medfilt
 # for impulse masking
 from itertools import chain, repeat
 
+# for spectrogram framing
+from numpy.lib.stride_tricks import sliding_window_view
+from functools import lru_cache
+
+
+@lru_cache(maxsize=32)
+def makeWindow(window, window_width):
+    """Returns the named spectrogram window of length window_width.
+    Cached, since the same few windows are used for every spectrogram;
+    the returned array is read-only.
+    """
+    if window == "Hann":
+        # This is the Hann window
+        window = 0.5 * (
+            1 - np.cos(2 * np.pi * np.arange(window_width) / (window_width - 1))
+        )
+    elif window == "Parzen":
+        # Parzen (window_width even)
+        n = np.arange(window_width) - 0.5 * window_width
+        window = np.where(
+            np.abs(n) < 0.25 * window_width,
+            1
+            - 6
+            * (n / (0.5 * window_width)) ** 2
+            * (1 - np.abs(n) / (0.5 * window_width)),
+            2 * (1 - np.abs(n) / (0.5 * window_width)) ** 3,
+        )
+    elif window == "Welch":
+        # Welch
+        window = (
+            1.0
+            - (
+                (np.arange(window_width) - 0.5 * (window_width - 1))
+                / (0.5 * (window_width - 1))
+            )
+            ** 2
+        )
+    elif window == "Hamming":
+        # Hamming
+        alpha = 0.54
+        beta = 1.0 - alpha
+        window = alpha - beta * np.cos(
+            2 * np.pi * np.arange(window_width) / (window_width - 1)
+        )
+    elif window == "Blackman":
+        # Blackman
+        alpha = 0.16
+        a0 = 0.5 * (1 - alpha)
+        a1 = 0.5
+        a2 = 0.5 * alpha
+        window = (
+            a0
+            - a1 * np.cos(2 * np.pi * np.arange(window_width) / (window_width - 1))
+            + a2 * np.cos(4 * np.pi * np.arange(window_width) / (window_width - 1))
+        )
+    elif window == "BlackmanHarris":
+        # Blackman-Harris
+        a0 = 0.358375
+        a1 = 0.48829
+        a2 = 0.14128
+        a3 = 0.01168
+        window = (
+            a0
+            - a1 * np.cos(2 * np.pi * np.arange(window_width) / (window_width - 1))
+            + a2 * np.cos(4 * np.pi * np.arange(window_width) / (window_width - 1))
+            - a3 * np.cos(6 * np.pi * np.arange(window_width) / (window_width - 1))
+        )
+    elif window == "Ones":
+        window = np.ones(window_width)
+    else:
+        window = 0.5 * (
+            1 - np.cos(2 * np.pi * np.arange(window_width) / (window_width - 1))
+        )
+    window.flags.writeable = False
+    return window
+
 
 class SignalProc:
     """This class reads and holds the audiodata and spectrogram, to be used in the main interface.
@@ -68,8 +145,11 @@ class SignalProc:
             self.audioFormat.setByteOrder(QAudioFormat.LittleEndian)
 
     def readWav(self, file, len=None, off=0, silent=False):
-        """Args the same as for wavio.read: filename, length in seconds, offset in seconds."""
-        wavobj = wavio.read(file, len, off)
+        """Args the same as for wavio.read: filename, length in seconds, offset in seconds.
+        The samples are memory-mapped and converted to float straight from the mapping,
+        which avoids holding a separate raw copy of the file in memory.
+        """
+        wavobj = wavio.read(file, len, off, mmap=True)
         self.data = wavobj.data
 
         # take only left channel
@@ -308,6 +388,7 @@ class SignalProc:
         mean_normalise=True,
         onesided=True,
         need_even=False,
+        dtype="float",
     ):
         """Compute the spectrogram from amplitude data
         Returns the power spectrum, not the density -- compute 10.*log10(sg) 10.*log10(sg) before plotting.
@@ -315,6 +396,8 @@ class SignalProc:
         Options: multitaper version, but it's slow, mean normalised, even, one-sided.
         This version is faster than the default versions in pylab and scipy.signal
         Assumes that the values are not normalised.
+        dtype: float precision to compute the standard spectrogram in; float32
+        halves memory traffic when full precision is not needed (e.g. CNN features).
         """
         if self.data is None or len(self.data) == 0:
             print("ERROR: attempted to calculate spectrogram without audiodata")
@@ -329,73 +412,11 @@ class SignalProc:
         if len(self.data) <= window_width:
             window_width = len(self.data) - 1
 
-        self.sg = np.copy(self.data)
-        if self.sg.dtype != "float":
-            self.sg = self.sg.astype("float")
+        # astype always copies, so self.data is untouched
+        self.sg = self.data.astype(dtype)
 
         # Set of window options
-        if window == "Hann":
-            # This is the Hann window
-            window = 0.5 * (
-                1 - np.cos(2 * np.pi * np.arange(window_width) / (window_width - 1))
-            )
-        elif window == "Parzen":
-            # Parzen (window_width even)
-            n = np.arange(window_width) - 0.5 * window_width
-            window = np.where(
-                np.abs(n) < 0.25 * window_width,
-                1
-                - 6
-                * (n / (0.5 * window_width)) ** 2
-                * (1 - np.abs(n) / (0.5 * window_width)),
-                2 * (1 - np.abs(n) / (0.5 * window_width)) ** 3,
-            )
-        elif window == "Welch":
-            # Welch
-            window = (
-                1.0
-                - (
-                    (np.arange(window_width) - 0.5 * (window_width - 1))
-                    / (0.5 * (window_width - 1))
-                )
-                ** 2
-            )
-        elif window == "Hamming":
-            # Hamming
-            alpha = 0.54
-            beta = 1.0 - alpha
-            window = alpha - beta * np.cos(
-                2 * np.pi * np.arange(window_width) / (window_width - 1)
-            )
-        elif window == "Blackman":
-            # Blackman
-            alpha = 0.16
-            a0 = 0.5 * (1 - alpha)
-            a1 = 0.5
-            a2 = 0.5 * alpha
-            window = (
-                a0
-                - a1 * np.cos(2 * np.pi * np.arange(window_width) / (window_width - 1))
-                + a2 * np.cos(4 * np.pi * np.arange(window_width) / (window_width - 1))
-            )
-        elif window == "BlackmanHarris":
-            # Blackman-Harris
-            a0 = 0.358375
-            a1 = 0.48829
-            a2 = 0.14128
-            a3 = 0.01168
-            window = (
-                a0
-                - a1 * np.cos(2 * np.pi * np.arange(window_width) / (window_width - 1))
-                + a2 * np.cos(4 * np.pi * np.arange(window_width) / (window_width - 1))
-                - a3 * np.cos(6 * np.pi * np.arange(window_width) / (window_width - 1))
-            )
-        elif window == "Ones":
-            window = np.ones(window_width)
-        else:
-            window = 0.5 * (
-                1 - np.cos(2 * np.pi * np.arange(window_width) / (window_width - 1))
-            )
+        window = makeWindow(window, window_width)
 
         if equal_loudness:
             self.sg = self.equalLoudness(self.sg)
@@ -477,15 +498,20 @@ class SignalProc:
             # and possibly use less caching, at the cost of 1.5x longer CPU time.
             hi_mem = True
             if hi_mem:
-                ft = np.zeros((len(starts), window_width))
-                for i in starts:
-                    ft[i // incr, :] = self.sg[i : i + window_width]
-                ft = np.multiply(window, ft)
-
+                ft = np.zeros((len(starts), window_width), dtype=self.sg.dtype)
+                # all frames at once, as strided views into the data
+                nframes = len(range(0, len(self.sg) - window_width, incr))
+                frames = sliding_window_view(self.sg, window_width)[::incr]
+                ft[:nframes, :] = frames[:nframes]
+                ft = np.multiply(window.astype(ft.dtype, copy=False), ft)
+
+                # real FFT over all frames, split across all cores
                 if onesided:
-                    self.sg = np.absolute(fft.fft(ft)[:, : window_width // 2])
+                    self.sg = np.absolute(
+                        sp_fft.rfft(ft, workers=-1)[:, : window_width // 2]
+                    )
                 else:
-                    self.sg = np.absolute(fft.fft(ft))
+                    self.sg = np.absolute(sp_fft.fft(ft, workers=-1))
             else:
                 if onesided:
                     ft = np.zeros((len(starts), window_width // 2))
@@ -520,16 +546,20 @@ class SignalProc:
         Latter sets a non-normalised log, useful for fixed-scale bat images.
         """
         LOG_OFFSET = 1e-7
+        # (the log transforms work in place on a single copy of self.sg)
         if tr == "Log":
             sg = self.sg + LOG_OFFSET
             minsg = np.min(sg)
-            sg = 10 * (np.log10(sg) - np.log10(minsg))
-            sg = np.abs(sg)
+            np.log10(sg, out=sg)
+            sg -= np.log10(minsg)
+            sg *= 10
+            np.abs(sg, out=sg)
             return sg
         elif tr == "Batmode":
             sg = self.sg + LOG_OFFSET
-            sg = 10 * np.log10(sg)
-            sg = np.abs(sg)
+            np.log10(sg, out=sg)
+            sg *= 10
+            np.abs(sg, out=sg)
             return sg
         elif tr == "Box-Cox":
             size = np.shape(self.sg)
@@ -1365,6 +1395,10 @@ class SignalProc:
         :param fp: frequency proportion to consider it as an impulse (cols of the spectrogram)
         :return: audiodata
         """
+        # A silent recording has no impulses, and masking would not change it anyway
+        if not np.any(self.data):
+            return self.data
+
         # print("Impulse masking...")
         imps = self.impulse_cal(fs=self.sampleRate, engp=engp, fp=fp)
         # print("Samples to mask: ", len(self.data) - np.sum(imps))
@@ -1472,7 +1506,8 @@ class SignalProc:
             n = (seglen - frame_size) // frame_hop + 1
         n = int(n)
 
-        _ = self.spectrogram()
+        # features are float32 anyway, so compute the spectrogram in that
+        _ = self.spectrogram(dtype=np.float32)
 
         # Mask out of band elements
         spec_height = np.shape(self.sg)[1]
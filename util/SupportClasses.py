@@ -28,8 +28,84 @@ import math
 import numpy as np
 import os, json
 import re
-from tensorflow.keras.models import model_from_json
-from tensorflow.keras.models import load_model
+
+# orjson parses JSON much faster, but fall back to json if it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loadJSON(file):
+    """Reads a JSON file with a single read() and parses it,
+    using orjson if available. Raises ValueError on corrupt JSON.
+    """
+    with open(file, "rb") as f:
+        content = f.read()
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def _finiteJSON(obj):
+    """Returns obj with NaN and infinite floats replaced by None,
+    as orjson writes them.
+    """
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _finiteJSON(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finiteJSON(v) for v in obj]
+    return obj
+
+
+def dumpJSON(obj):
+    """Serializes obj to newline-terminated JSON bytes,
+    using orjson if available (which also handles numpy types).
+    NaN and infinite floats are written as null with or without orjson,
+    so the output is valid JSON either way.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                obj, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_SERIALIZE_NUMPY
+            )
+        except TypeError:
+            # unusual types that only json knows about, e.g. non-str dict keys
+            pass
+    return (json.dumps(_finiteJSON(obj), allow_nan=False) + "\n").encode("utf-8")
+
+
+def writeAtomic(file, content):
+    """Writes bytes to a temporary file next to file and renames it over file,
+    so an interrupted save never leaves a half-written file behind.
+    """
+    tmp = file + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, file)
+
+
+# set once GPU memory growth has been configured
+_tfConfigured = False
+
+
+def loadTensorflow():
+    """Imports TensorFlow on first use and sets up GPU memory growth.
+    Returns the tensorflow module.
+    """
+    import tensorflow as tf
+
+    global _tfConfigured
+    if not _tfConfigured:
+        _tfConfigured = True
+        try:
+            physical_devices = tf.config.list_physical_devices("GPU")
+            tf.config.experimental.set_memory_growth(physical_devices[0], True)
+        except:
+            pass
+    return tf
 
 
 class Log(object):
@@ -181,10 +257,7 @@ class ConfigLoader(object):
         # It will always be in user configdir, otherwise it would be impossible to find.
         # print("Loading software settings from file %s" % file)
         try:
-            f = open(file)
-            config = json.load(f)
-            f.close()
-            return config
+            return loadJSON(file)
         except ValueError:
             # if JSON looks corrupt, quit:
             msg = SupportClasses_GUI.MessagePopup(
@@ -199,27 +272,47 @@ class ConfigLoader(object):
         """Returns a dict of filter JSONs,
         named after the corresponding file names.
         bats - include bat filters?
+        Parsed filters are cached as JSON in dir/.filters.cache, keyed by the
+        mtime and size of each file, so only changed files are re-parsed.
         """
         # print("Loading call filters from folder %s" % dir)
         try:
-            filters = [
-                f for f in os.listdir(dir) if os.path.isfile(os.path.join(dir, f))
-            ]
+            # (scandir gets file types, and stats on Windows, with the listing)
+            with os.scandir(dir) as it:
+                filters = [entry for entry in it if entry.is_file()]
         except Exception:
             # print("Folder %s not found, no filters loaded" % dir)
             return None
 
+        cachefile = os.path.join(dir, ".filters.cache")
+        try:
+            cache = loadJSON(cachefile)
+            if not isinstance(cache, dict):
+                cache = dict()
+        except Exception:
+            cache = dict()
+        newcache = dict()
+        changed = False
+
         goodfilters = dict()
-        for filtfile in filters:
+        for entry in filters:
+            filtfile = entry.name
             if not filtfile.endswith("txt"):
                 continue
             # Very primitive way to recognize bat filters
             if not bats and filtfile.endswith("Bats.txt"):
                 continue
             try:
-                ff = open(os.path.join(dir, filtfile))
-                filt = json.load(ff)
-                ff.close()
+                st = entry.stat()
+                stamp = [st.st_mtime_ns, st.st_size]
+                # unchanged since the last load, so reuse the parsed filter
+                cached = cache.get(filtfile)
+                if isinstance(cached, list) and len(cached) == 2 and cached[0] == stamp:
+                    goodfilters[filtfile[:-4]] = cache[filtfile][1]
+                    newcache[filtfile] = cache[filtfile]
+                    continue
+
+                filt = loadJSON(entry.path)
 
                 # skip this filter if it looks fishy:
                 if (
@@ -255,8 +348,17 @@ class ConfigLoader(object):
                 # if filter passed checks, store it,
                 # using filename (without extension) as the key
                 goodfilters[filtfile[:-4]] = filt
+                newcache[filtfile] = [stamp, filt]
+                changed = True
             except Exception as e:
                 print("Could not load filter:", filtfile, e)
+
+        if changed or newcache.keys() != cache.keys():
+            try:
+                with open(cachefile, "wb") as f:
+                    f.write(dumpJSON(newcache))
+            except Exception as e:
+                print("Warning: could not store filter cache", cachefile, e)
         # print("Loaded filters:", list(goodfilters.keys()))
         return goodfilters
 
@@ -272,6 +374,11 @@ class ConfigLoader(object):
             if "CNN" not in filt:
                 continue
             elif filt["CNN"]:
+                # TensorFlow takes seconds to import, so only do it
+                # once a CNN is actually needed
+                loadTensorflow()
+                from tensorflow.keras.models import model_from_json, load_model
+
                 if species == "NZ Bats":
                     try:
                         model = load_model(
@@ -355,9 +462,7 @@ class ConfigLoader(object):
                 shortblfile = os.path.join(configdir, "ListCommonBirds.txt")
 
             try:
-                json_file = open(shortblfile)
-                readlist = json.load(json_file)
-                json_file.close()
+                readlist = loadJSON(shortblfile)
                 if len(readlist) > 29:
                     print(
                         "Warning: short species list has %s entries, truncating to 30"
@@ -403,9 +508,7 @@ class ConfigLoader(object):
                 longblfile = os.path.join(configdir, "ListDOCBirds.txt")
 
             try:
-                json_file = open(longblfile)
-                readlist = json.load(json_file)
-                json_file.close()
+                readlist = loadJSON(longblfile)
                 return readlist
             except ValueError as e:
                 msg = SupportClasses_GUI.MessagePopup(
@@ -443,9 +546,7 @@ class ConfigLoader(object):
                 blfile = os.path.join(configdir, "ListBats.txt")
 
             try:
-                json_file = open(blfile)
-                readlist = json.load(json_file)
-                json_file.close()
+                readlist = loadJSON(blfile)
                 return readlist
             except ValueError as e:
                 # print(e)
@@ -474,10 +575,7 @@ class ConfigLoader(object):
     def learningParams(self, file):
         # print("Loading software settings from file %s" % file)
         try:
-            configfile = open(file)
-            config = json.load(configfile)
-            configfile.close()
-            return config
+            return loadJSON(file)
         except ValueError:
             # if JSON looks corrupt, quit:
             msg = SupportClasses_GUI.MessagePopup(
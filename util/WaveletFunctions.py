@@ -36,23 +36,16 @@ def graycode(n):
     """Returns a MODIFIED Gray permutation of n -
     which corresponds to the frequency band of position n.
     Input and output are integer ranks indicating position within level."""
-    # convert number to binary repr string:
-    n = bin(n)[2:]
-    out = ""
-    # never flip first bit
-    toflip = False
-    while n != "":
-        # store leftmost bit or its complement to output
-        if toflip:
-            out = out + str(1 - int(n[0]))
-        else:
-            out = out + n[0]
-        # strip leftmost bit
-        n = n[1:]
-        # if this bit was 1, flip next bit
-        toflip = bool(out[-1] == "1")
-
-    return int(out, 2)
+    # each output bit is the input bit, flipped if the output bit to its
+    # left is 1 (first bit never flipped). That is a running XOR of all
+    # higher input bits, so fold the shifted input in on integers instead
+    # of rebuilding a binary string one character at a time.
+    out = n
+    n >>= 1
+    while n:
+        out ^= n
+        n >>= 1
+    return out
 
 
 def getWCFreq(node, sampleRate):
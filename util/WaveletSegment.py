@@ -23,7 +23,8 @@ import librosa
 import copy
 import time, os, math, csv, gc
 import numpy as np
-from itertools import combinations
+from itertools import combinations, repeat
+from concurrent.futures import ProcessPoolExecutor
 
 import util.WaveletFunctions as WaveletFunctions
 import util.SignalProc as SignalProc
@@ -599,6 +600,9 @@ class WaveletSegment:
         # TODO this part can be entirely replaced with larger K
         # b/c 15 nodes produce 32k subsets over all K.
         # STEPWISE part, with top N best subsets used to initialise N runs
+        # (kept serial, unlike gridSearch: each thr only ORs and scores the
+        #  precomputed alldetections rows, which is cheap next to copying
+        #  alldetections into worker processes)
         opstartingtime = time.time()
         print("--- Starting stepwise search ---")
         NTOPSETS = 1  # how many different initialisations to use
@@ -722,18 +726,10 @@ class WaveletSegment:
 
         # clear storage for multifile processing
         detected_out = []
-        filenames = []
         self.annotation = []
 
         # find audio files with 0/1 annotations:
-        for root, dirs, files in os.walk(dirName):
-            for file in files:
-                if (
-                    file.lower().endswith(".wav")
-                    and os.stat(os.path.join(root, file)).st_size != 0
-                    and file[:-4] + "-GT.txt" in files
-                ):
-                    filenames.append(os.path.join(root, file))
+        filenames = self.findGTFiles(dirName)
         if len(filenames) < 1:
             print("ERROR: no suitable files")
             return
@@ -879,7 +875,8 @@ class WaveletSegment:
         fB = ((1.0 + beta**2) * recall * precision) / (recall + beta**2 * precision)
         return fB
 
-    def fBetaScore(self, annotation, predicted, beta=2):
+    @staticmethod
+    def fBetaScore(annotation, predicted, beta=2):
         """Computes the beta scores given two sets of predictions"""
         annotation = np.array(annotation)
         predicted = np.array(predicted)
@@ -1417,51 +1414,61 @@ class WaveletSegment:
                 ]
             )
             windE = np.log(windE)
-            for w in range(datalen):
-                regy = windE[w, :]
-                # ---- REGRESSION IS DONE HERE ----
-                if wind == 1:
-                    pol = np.polynomial.polynomial.Polynomial.fit(regx, regy, 3)
-                elif wind == 2:
-                    # TODO sklearn will add quantreg in v1.0, see if it is any better
+
+            # log(freq) points where each target node is predicted.
+            # Higher level nodes average the predictions at two points,
+            # +-half width of a leaf node band (= Fs/2/numnodes/2) around the center
+            delta = wf.treefs / 128
+            evalx = []
+            twopoint = np.zeros(len(nodelist), dtype=bool)
+            for node_ix in range(len(nodelist)):
+                if nodelist[node_ix] in range(15, 31):
+                    fc = np.exp(tgtnodecenters[node_ix])
+                    evalx.extend([np.log(fc - delta), np.log(fc + delta)])
+                    twopoint[node_ix] = True
+                else:
+                    evalx.append(tgtnodecenters[node_ix])
+            evalx = np.asarray(evalx)
+
+            # ---- REGRESSION IS DONE HERE ----
+            # rawpred: windows x evalx predicted log energies
+            if wind == 1:
+                # x is the same for every window, so all windows
+                # can be fitted in one least squares solve
+                coefs = np.polynomial.polynomial.polyfit(regx, windE.T, 3)
+                rawpred = np.polynomial.polynomial.polyval(evalx, coefs)
+            elif wind == 2:
+                # TODO sklearn will add quantreg in v1.0, see if it is any better
+                rawpred = np.zeros((datalen, len(evalx)))
+                for w in range(datalen):
                     pol = WaveletFunctions.QuantReg(
-                        regy, regx, q=0.2, max_iter=250, p_tol=1e-3
+                        windE[w, :], regx, q=0.2, max_iter=250, p_tol=1e-3
                     )
+                    rawpred[w, :] = pol(evalx)
+            else:
+                print("ERROR: unrecognized wind adjustment %s" % wind)
+                raise
+
+            # Oversubtraction, and averaging for higher level nodes:
+            col = 0
+            for node_ix in range(len(nodelist)):
+                ncols = 2 if twopoint[node_ix] else 1
+                nodepred = (
+                    rawpred[:, col : col + ncols] - bgpow[node_ix]
+                ) * OVERSUBALPHA + bgpow[node_ix]
+                if twopoint[node_ix]:
+                    pred[:, node_ix] = np.log(np.mean(np.exp(nodepred), axis=1))
                 else:
-                    print("ERROR: unrecognized wind adjustment %s" % wind)
-                    raise
-
-                # Interpolate using the fitted model:
-                for node_ix in range(len(nodelist)):
-                    # for higher level nodes, need to (linearly) average the nearest predictions:
-                    if nodelist[node_ix] in range(15, 31):
-                        delta = (
-                            wf.treefs / 128
-                        )  # half width of a leaf node band = Fs/2/numnodes/2
-                        f1 = np.exp(tgtnodecenters[node_ix]) - delta
-                        f2 = np.exp(tgtnodecenters[node_ix]) + delta
-                        pred1 = pol(np.log(f1))
-                        pred2 = pol(np.log(f2))
-                        # oversubtraction:
-                        pred1 = (pred1 - bgpow[node_ix]) * OVERSUBALPHA + bgpow[node_ix]
-                        pred2 = (pred2 - bgpow[node_ix]) * OVERSUBALPHA + bgpow[node_ix]
-                        pred[w, node_ix] = np.log((np.exp(pred1) + np.exp(pred2)) / 2)
-                    else:
-                        # Straightforward for 5th lvl nodes
-                        pred[w, node_ix] = pol(tgtnodecenters[node_ix])
-                        # Oversubtraction:
-                        pred[w, node_ix] = (
-                            pred[w, node_ix] - bgpow[node_ix]
-                        ) * OVERSUBALPHA + bgpow[node_ix]
-                # print("Predictions (log): ", pred[w,:])
-            # TODO would probably be faster to predict all nodes and then average
-            # to obtain upper level nodes, but difficult to keep track of nodes then.
+                    # Straightforward for 5th lvl nodes
+                    pred[:, node_ix] = nodepred[:, 0]
+                col += ncols
 
             # convert back to (linear) energies:
             pred = np.exp(pred + qrbiasadjust)
 
         # Compute the number of samples in a window -- species specific
-        detected = np.empty((0, 3))
+        # (detections from each node are stacked once, after the loop)
+        detected = [np.empty((0, 3))]
         for node_ix in range(len(nodelist)):
             node = nodelist[node_ix]
             # Extracts energies (i.e. integral of square magnitudes) over windows.
@@ -1523,7 +1530,9 @@ class WaveletSegment:
             # convert from the window scale into actual seconds
             segm1[:, :2] = segm1[:, :2] * realwindow
 
-            detected = np.vstack((detected, np.asarray(segm1)))
+            detected.append(segm1)
+
+        detected = np.vstack(detected)
 
         # keep only S and their positions:
         if np.shape(detected)[0] > 0:
@@ -1543,12 +1552,16 @@ class WaveletSegment:
         gc.collect()
         return outsegs
 
-    def gridSearch(self, E, thrList, MList, learnMode=None, window=1, inc=None):
+    def gridSearch(
+        self, E, thrList, MList, learnMode=None, window=1, inc=None, workers=2
+    ):
         """Take list of energy peaks of dimensions:
         [files] [MListxTxN ndarrays],
         perform grid search over thr and M parameters,
         do a stepwise search for best nodes for detecting calls.
         In turn, calls are detected when the peaks exceed thrList (provided peaks can be max, mean...)
+        workers: max number of worker processes. Each gets its own copy of E,
+        so keep this low on small machines (1 runs everything in this process).
         Output structure:
         1. 2d list of [nodes]
             (1st d runs over M, 2nd d runs over thr)
@@ -1568,136 +1581,51 @@ class WaveletSegment:
         finalnodes = []
         top_nodes = []
 
-        # Grid search over M x thr x Files
+        # load the annotations
+        if (inc is not None and inc != 1) or window != 1:
+            annotations = self.annotation2
+        else:
+            annotations = self.annotation
+
+        # fill top node lists
+        for indexF in range(len(E)):
+            if np.sum(annotations[indexF]) > 0:
+                top_nodes.extend(self.bestNodes[indexF][0:2])
+
+        # Grid search over M x thr x Files.
+        # The cells are independent, so they run in parallel processes
+        # which receive the energies and annotations once, at startup.
+        cells = [(indexM, thr) for indexM in range(len(MList)) for thr in thrList]
+        cellsM = [cell[0] for cell in cells]
+        cellsThr = [cell[1] for cell in cells]
+        workers = min(workers, len(cells), os.cpu_count() or 1)
+        if workers > 1:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_initGridSearch,
+                initargs=(E, self.bestNodes, annotations),
+            ) as pool:
+                results = list(
+                    pool.map(
+                        _gridSearchCell, cellsM, cellsThr, repeat(window), repeat(inc)
+                    )
+                )
+        else:
+            # not worth starting (and copying E into) a worker process
+            _initGridSearch(E, self.bestNodes, annotations)
+            try:
+                results = list(
+                    map(_gridSearchCell, cellsM, cellsThr, repeat(window), repeat(inc))
+                )
+            finally:
+                _initGridSearch(None, None, None)
+        results = iter(results)
+
         for indexM in range(len(MList)):
             finalnodesT = []
             for indext in range(len(thrList)):
-                # Accumulate nodes for the set of files for this M and thr
-                finalnodesMT = []
-                detected_all = []
-                annot_all = []
-                # loop over files:
-                for indexF in range(len(E)):
-                    # Best nodes found within this file:
-                    finalnodesF = []
-                    bestBetaScore = 0
-                    bestRecall = 0
-
-                    EfileM = E[indexF][indexM, :, :]
-                    nodesToTest = self.bestNodes[indexF]
-                    # load the annotations for this file
-                    if (inc is not None and inc != 1) or window != 1:
-                        annot = self.annotation2[indexF]
-                    else:
-                        annot = self.annotation[indexF]
-
-                    # In addition to the correlation, re-order nodes according to fB. The order of nodes seems really
-                    # important.
-                    thisfile_fBs = []
-                    for nodenum in range(len(nodesToTest)):
-                        detect_onenode = EfileM[:, nodenum] > thrList[indext]
-                        if window != 1 or inc is not None:
-                            if inc is None:
-                                inc2 = window
-                            else:
-                                inc2 = inc
-                            # detected length is equal to the number of windows.
-                            N = len(annot)
-                            detect_ann = np.zeros(N)
-                            start = 0
-                            # map detect_onenode to non-standard annotation windows
-                            for i in range(len(detect_onenode)):
-                                if detect_onenode[i] == 1:
-                                    end = int(min(math.ceil(start + 1), N))
-                                    detect_ann[int(math.floor(start)) : end] = 1
-                                start += inc2
-                            detect_onenode = detect_ann
-
-                        thisnode_fB, _, _, _, _, _ = self.fBetaScore(
-                            annot, detect_onenode
-                        )
-                        if thisnode_fB:
-                            thisfile_fBs.append(thisnode_fB)
-                        else:
-                            thisfile_fBs.append(0.0)
-                    thisfile_node_ix = np.argsort(np.array(thisfile_fBs)).tolist()[::-1]
-                    print(
-                        "thisfile_fBs:%s, nodes:%s"
-                        % (str(thisfile_fBs), str(nodesToTest))
-                    )
-
-                    ### STEPWISE SEARCH for best node combination:
-                    # (try to detect using thr, add node if it improves F2)
-                    print(
-                        "Starting stepwise search. Possible nodes:",
-                        list(np.array(nodesToTest)[thisfile_node_ix]),
-                    )
-                    detect_best = np.zeros(len(EfileM[:, 0]))
-                    for nodenum in thisfile_node_ix:
-                        print("Testing node ", nodesToTest[nodenum])
-                        detect_onenode = EfileM[:, nodenum] > thrList[indext]
-
-                        if window != 1 or inc is not None:
-                            if inc is None:
-                                inc2 = window
-                            else:
-                                inc2 = inc
-                            # detected length is equal to the number of windows.
-                            N = len(annot)
-                            detect_ann = np.zeros(N)
-                            start = 0
-                            # map detect_onenode to non-standard annotation windows
-                            for i in range(len(detect_onenode)):
-                                if detect_onenode[i] == 1:
-                                    end = int(min(math.ceil(start + 1), N))
-                                    detect_ann[int(math.floor(start)) : end] = 1
-                                start += inc2
-                            detect_onenode = detect_ann
-
-                        # What do we detect if we add this node to currently best detections?
-                        detect_allnodes = np.maximum.reduce(
-                            [detect_best, detect_onenode]
-                        )
-                        fB, recall, tp, fp, tn, fn = self.fBetaScore(
-                            annot, detect_allnodes
-                        )
-
-                        # If this node improved fB,
-                        # store it and update fB, recall, best detections, and optimum nodes
-                        if fB is not None and fB > bestBetaScore:
-                            bestBetaScore = fB
-                            bestRecall = recall
-                            detect_best = detect_allnodes
-                            finalnodesF.append(nodesToTest[nodenum])
-                        # Adding more nodes will not reduce FPs, so this is sufficient to stop:
-                        # Stopping a bit earlier to have fewer nodes and fewer FPs:
-                        if bestBetaScore == 0.95 or bestRecall == 0.95:
-                            break
-
-                    # Store the best nodes for this file
-                    finalnodesMT.append(finalnodesF)
-                    print(
-                        "Iteration f %d/%d complete" % (indexF + 1, len(self.audioList))
-                    )
-
-                    # fill top node lists
-                    if np.sum(annot) > 0:
-                        top_nodes.extend(nodesToTest[0:2])
-
-                    # Memory cleanup:
-                    gc.collect()
-
-                    # build long vectors of detections and annotations
-                    detected_all.extend(detect_best)
-                    annot_all.extend(annot)
-
-                # One iteration done, store results
-                finalnodesMT = [y for x in finalnodesMT for y in x]
-                finalnodesMT = list(set(finalnodesMT))
+                finalnodesMT, tp, fp, tn, fn = next(results)
                 finalnodesT.append(finalnodesMT)
-                # Get the measures with the selected node set for this threshold and M over the set of files
-                # TODO check if this needs fixing for non-standard window and inc (used to use self.annotation2?)
-                fB, recall, tp, fp, tn, fn = self.fBetaScore(annot_all, detected_all)
                 tpa[indexM, indext] = tp
                 fpa[indexM, indext] = fp
                 tna[indexM, indext] = tn
@@ -1809,6 +1737,38 @@ class WaveletSegment:
         gc.collect()
         return denoisedData
 
+    def findGTFiles(self, dirName):
+        """Walks dirName once and returns the paths of all non-empty wavs
+        that have a matching -GT.txt annotation file next to them.
+        """
+        filenames = []
+        # scandir entries carry their own stat info, so no extra
+        # syscall per file (free on Windows, cached elsewhere)
+        todo = [str(dirName)]
+        while todo:
+            root = todo.pop()
+            # unreadable folders are skipped, as os.walk does
+            try:
+                with os.scandir(root) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            fileset = {e.name for e in entries if e.is_file()}
+            subdirs = []
+            for entry in entries:
+                # (symlinked folders are not followed, so links cannot loop)
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif (
+                    entry.name.lower().endswith(".wav")
+                    and entry.name[:-4] + "-GT.txt" in fileset
+                    and entry.stat().st_size != 0
+                ):
+                    filenames.append(entry.path)
+            # depth-first, in listing order, as os.walk would visit them
+            todo.extend(reversed(subdirs))
+        return filenames
+
     def loadDirectory(self, dirName, denoise, impMask=True):
         """
         Finds and reads wavs from directory dirName.
@@ -1829,35 +1789,28 @@ class WaveletSegment:
         self.annotation = []
         self.audioList = []
 
-        for root, dirs, files in os.walk(str(dirName)):
-            for file in files:
-                if (
-                    file.lower().endswith(".wav")
-                    and os.stat(os.path.join(root, file)).st_size != 0
-                    and file[:-4] + "-GT.txt" in files
-                ):
-                    opstartingtime = time.time()
-                    wavFile = os.path.join(root, file)
-                    self.filenames.append(wavFile)
-
-                    # adds to self.annotation array, also sets self.sp data and sampleRate
-                    succ = self.loadData(wavFile, impMask=impMask)
-                    if not succ:
-                        print("ERROR: failed to load file", wavFile)
-                        return
-
-                    # resample, denoise and store the resulting audio data:
-                    # note: preprocessing is a side effect on data
-                    # (preprocess only reads target nodes from spInfo)
-                    denoisedData = self.preprocess(
-                        self.sp.data,
-                        self.sp.sampleRate,
-                        self.spInfo["SampleRate"],
-                        d=denoise,
-                    )
-                    self.audioList.append(denoisedData)
+        for wavFile in self.findGTFiles(dirName):
+            opstartingtime = time.time()
+            self.filenames.append(wavFile)
+
+            # adds to self.annotation array, also sets self.sp data and sampleRate
+            succ = self.loadData(wavFile, impMask=impMask)
+            if not succ:
+                print("ERROR: failed to load file", wavFile)
+                return
 
-                    print("file loaded in", time.time() - opstartingtime)
+            # resample, denoise and store the resulting audio data:
+            # note: preprocessing is a side effect on data
+            # (preprocess only reads target nodes from spInfo)
+            denoisedData = self.preprocess(
+                self.sp.data,
+                self.sp.sampleRate,
+                self.spInfo["SampleRate"],
+                d=denoise,
+            )
+            self.audioList.append(denoisedData)
+
+            print("file loaded in", time.time() - opstartingtime)
 
         if len(self.annotation) == 0 or len(self.audioList) == 0:
             print("ERROR: no files loaded!")
@@ -1890,32 +1843,25 @@ class WaveletSegment:
         self.audioList = []
         print("Loading data from dir", dirName)
 
-        for root, dirs, files in os.walk(str(dirName)):
-            for file in files:
-                if (
-                    file.lower().endswith(".wav")
-                    and os.stat(os.path.join(root, file)).st_size != 0
-                    and file[:-4] + "-GT.txt" in files
-                ):
-                    opstartingtime = time.time()
-                    wavFile = os.path.join(root, file)
-                    self.filenames.append(wavFile)
-
-                    # adds to self.annotation array, also sets self.sp data and sampleRate
-                    self.loadDataChp(wavFile, window)
-
-                    # resample, denoise and store the resulting audio data:
-                    # note: preprocessing is a side effect on data
-                    # (preprocess only reads target nodes from spInfo)
-                    denoisedData = self.preprocess(
-                        self.sp.data,
-                        self.sp.sampleRate,
-                        self.spInfo["SampleRate"],
-                        d=False,
-                    )
-                    self.audioList.append(denoisedData)
+        for wavFile in self.findGTFiles(dirName):
+            opstartingtime = time.time()
+            self.filenames.append(wavFile)
 
-                    print("file loaded in %.3f s" % (time.time() - opstartingtime))
+            # adds to self.annotation array, also sets self.sp data and sampleRate
+            self.loadDataChp(wavFile, window)
+
+            # resample, denoise and store the resulting audio data:
+            # note: preprocessing is a side effect on data
+            # (preprocess only reads target nodes from spInfo)
+            denoisedData = self.preprocess(
+                self.sp.data,
+                self.sp.sampleRate,
+                self.spInfo["SampleRate"],
+                d=False,
+            )
+            self.audioList.append(denoisedData)
+
+            print("file loaded in %.3f s" % (time.time() - opstartingtime))
 
         if len(self.annotation) == 0 or len(self.audioList) == 0:
             print("ERROR: no files loaded!")
@@ -2027,3 +1973,131 @@ class WaveletSegment:
             "%d blocks read, %d presence blocks found. %d blocks stored so far.\n"
             % (nwins, presblocks, totalblocks)
         )
+
+
+# Grid search inputs, sent once to each worker process by _initGridSearch
+_gridData = None
+
+
+def _initGridSearch(E, bestNodes, annotations):
+    global _gridData
+    if E is None:
+        _gridData = None
+    else:
+        _gridData = (E, bestNodes, annotations)
+
+
+def _gridSearchCell(indexM, thr, window, inc):
+    """One (M, thr) cell of WaveletSegment.gridSearch, run in a worker process.
+    Stepwise-selects the best nodes in each file and scores the
+    detections over all files. Returns (nodes, tp, fp, tn, fn).
+    """
+    E, bestNodes, annotations = _gridData
+    # Accumulate nodes for the set of files for this M and thr
+    finalnodesMT = []
+    detected_all = []
+    annot_all = []
+    # loop over files:
+    for indexF in range(len(E)):
+        # Best nodes found within this file:
+        finalnodesF = []
+        bestBetaScore = 0
+        bestRecall = 0
+
+        EfileM = E[indexF][indexM, :, :]
+        nodesToTest = bestNodes[indexF]
+        annot = annotations[indexF]
+
+        # In addition to the correlation, re-order nodes according to fB. The order of nodes seems really
+        # important.
+        thisfile_fBs = []
+        for nodenum in range(len(nodesToTest)):
+            detect_onenode = EfileM[:, nodenum] > thr
+            if window != 1 or inc is not None:
+                if inc is None:
+                    inc2 = window
+                else:
+                    inc2 = inc
+                # detected length is equal to the number of windows.
+                N = len(annot)
+                detect_ann = np.zeros(N)
+                start = 0
+                # map detect_onenode to non-standard annotation windows
+                for i in range(len(detect_onenode)):
+                    if detect_onenode[i] == 1:
+                        end = int(min(math.ceil(start + 1), N))
+                        detect_ann[int(math.floor(start)) : end] = 1
+                    start += inc2
+                detect_onenode = detect_ann
+
+            thisnode_fB, _, _, _, _, _ = WaveletSegment.fBetaScore(
+                annot, detect_onenode
+            )
+            if thisnode_fB:
+                thisfile_fBs.append(thisnode_fB)
+            else:
+                thisfile_fBs.append(0.0)
+        thisfile_node_ix = np.argsort(np.array(thisfile_fBs)).tolist()[::-1]
+        print("thisfile_fBs:%s, nodes:%s" % (str(thisfile_fBs), str(nodesToTest)))
+
+        ### STEPWISE SEARCH for best node combination:
+        # (try to detect using thr, add node if it improves F2)
+        print(
+            "Starting stepwise search. Possible nodes:",
+            list(np.array(nodesToTest)[thisfile_node_ix]),
+        )
+        detect_best = np.zeros(len(EfileM[:, 0]))
+        for nodenum in thisfile_node_ix:
+            print("Testing node ", nodesToTest[nodenum])
+            detect_onenode = EfileM[:, nodenum] > thr
+
+            if window != 1 or inc is not None:
+                if inc is None:
+                    inc2 = window
+                else:
+                    inc2 = inc
+                # detected length is equal to the number of windows.
+                N = len(annot)
+                detect_ann = np.zeros(N)
+                start = 0
+                # map detect_onenode to non-standard annotation windows
+                for i in range(len(detect_onenode)):
+                    if detect_onenode[i] == 1:
+                        end = int(min(math.ceil(start + 1), N))
+                        detect_ann[int(math.floor(start)) : end] = 1
+                    start += inc2
+                detect_onenode = detect_ann
+
+            # What do we detect if we add this node to currently best detections?
+            detect_allnodes = np.maximum.reduce([detect_best, detect_onenode])
+            fB, recall, tp, fp, tn, fn = WaveletSegment.fBetaScore(
+                annot, detect_allnodes
+            )
+
+            # If this node improved fB,
+            # store it and update fB, recall, best detections, and optimum nodes
+            if fB is not None and fB > bestBetaScore:
+                bestBetaScore = fB
+                bestRecall = recall
+                detect_best = detect_allnodes
+                finalnodesF.append(nodesToTest[nodenum])
+            # Adding more nodes will not reduce FPs, so this is sufficient to stop:
+            # Stopping a bit earlier to have fewer nodes and fewer FPs:
+            if bestBetaScore == 0.95 or bestRecall == 0.95:
+                break
+
+        # Store the best nodes for this file
+        finalnodesMT.append(finalnodesF)
+        print("Iteration f %d/%d complete" % (indexF + 1, len(E)))
+
+        # build long vectors of detections and annotations
+        detected_all.extend(detect_best)
+        annot_all.extend(annot)
+
+    # One iteration done, return results
+    finalnodesMT = [y for x in finalnodesMT for y in x]
+    finalnodesMT = list(set(finalnodesMT))
+    # Get the measures with the selected node set for this threshold and M over the set of files
+    # TODO check if this needs fixing for non-standard window and inc (used to use self.annotation2?)
+    fB, recall, tp, fp, tn, fn = WaveletSegment.fBetaScore(annot_all, detected_all)
+    return finalnodesMT, tp, fp, tn, fn
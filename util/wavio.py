@@ -32,6 +32,7 @@ POSSIBILITY OF SUCH DAMAGE.
 
 from __future__ import division as _division
 
+import os as _os
 import wave as _wave
 import numpy as _np
 
@@ -152,7 +153,26 @@ def readFmt(file):
     return (rate, nseconds, nchannels, sampwidth)
 
 
-def read(file, nseconds=None, offset=0):
+def _dataOffset(file):
+    """Returns the byte offset of the sample data in a RIFF WAV file,
+    by walking the chunk headers until the "data" chunk is found.
+    """
+    with open(file, "rb") as f:
+        header = f.read(12)
+        if header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            raise ValueError("file is not a RIFF WAVE file")
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                raise ValueError("data chunk not found")
+            if chunk[:4] == b"data":
+                return f.tell()
+            # chunks are padded to an even number of bytes
+            size = int.from_bytes(chunk[4:], "little")
+            f.seek(size + (size & 1), 1)
+
+
+def read(file, nseconds=None, offset=0, mmap=False):
     """
     Read a WAV file.
     Parameters
@@ -161,6 +181,9 @@ def read(file, nseconds=None, offset=0):
         Either the name of a file or an open file pointer.
     nseconds : length of part of file you wish to read (in seconds)
     offset : where to start reading from (in seconds)
+    mmap : if True and file is a file name, the samples are mapped
+        from disk with numpy.memmap instead of being copied into memory.
+        The returned array is then read-only. (Ignored for 24 bit files.)
     Returns
     -------
     wav : wavio.Wav() instance
@@ -201,7 +224,30 @@ def read(file, nseconds=None, offset=0):
         nseconds = float(nframes) / rate
     if nframes - offset * rate < 0:
         offset = 0
-    wav.setpos(int(offset * rate))
+
+    startframe = int(offset * rate)
+    numframes = min(int(nseconds * rate), nframes - startframe)
+    if mmap and isinstance(file, str) and sampwidth != 3 and numframes > 0:
+        dataoffset = _dataOffset(file)
+        # truncated files (e.g. recorder lost power) have fewer frames
+        # than the header says, so only map what is actually on disk
+        framesize = sampwidth * nchannels
+        available = (_os.path.getsize(file) - dataoffset) // framesize - startframe
+        numframes = min(numframes, available)
+        if numframes > 0:
+            wav.close()
+            # 8 bit samples are stored as unsigned ints; others as signed ints.
+            dt_char = "u" if sampwidth == 1 else "i"
+            array = _np.memmap(
+                file,
+                dtype="<%s%d" % (dt_char, sampwidth),
+                mode="r",
+                offset=dataoffset + startframe * framesize,
+                shape=(numframes, nchannels),
+            )
+            return Wav(data=array, rate=rate, sampwidth=sampwidth, nframes=nframes)
+
+    wav.setpos(startframe)
     data = wav.readframes(int(nseconds * rate))
 
     # data = wav.readframes(nframes)